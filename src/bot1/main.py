@@ -5,6 +5,7 @@ from datetime import datetime
 from dotenv import load_dotenv
 
 from bot1.crew import Bot1
+from bot1.tools.telegram_tool import TelegramNotificationTool
 
 # Load environment variables
 load_dotenv()
@@ -12,11 +13,30 @@ load_dotenv()
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
 
+def drain_outbox():
+    """
+    Deliver Telegram alerts waiting in the outbox.
+    Only retries queued messages; nothing upstream is recomputed.
+    """
+    try:
+        counts = TelegramNotificationTool().drain()
+        print(f"📤 Outbox: {counts['sent']} sent, {counts['pending']} pending, {counts['failed']} failed")
+        return counts
+    except Exception as e:
+        raise Exception(f"An error occurred while draining the Telegram outbox: {e}")
+
+
 def run_crm_alerts():
     """
     Run the CRM Lead Alerts system.
     Extracts leads from Notion, analyzes them, and sends alerts to Telegram.
     """
+    # Deliver alerts left over from previous runs; a broken outbox must not block new alerts
+    try:
+        drain_outbox()
+    except Exception as e:
+        print(f"⚠️  {e}")
+
     inputs = {
         'alert_criteria': '21+ days for critical, 14-20 days for warning, 7-13 days for attention',
         'team_name': 'Frutero'
@@ -24,6 +44,11 @@ def run_crm_alerts():
 
     try:
         result = Bot1().crew().kickoff(inputs=inputs)
+        # Retry anything the crew queued but could not send on the first attempt
+        try:
+            drain_outbox()
+        except Exception as e:
+            print(f"⚠️  {e}")
         print("\n✅ CRM Alerts sent successfully!")
         print(f"Result: {result}")
         return result
@@ -1,11 +1,35 @@
 """Notion CRM Tool for extracting leads data"""
+import json
 import os
+import threading
+import time
 import requests
-from datetime import datetime
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Set, Tuple
 from crewai.tools import BaseTool
 from pydantic import Field
 
+NOTION_API_URL = "https://api.notion.com/v1"
+NOTION_VERSION = "2022-06-28"
+
+
+class _RateLimiter:
+    """Spaces out requests shared by several worker threads"""
+
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
 
 class NotionCRMTool(BaseTool):
     """Tool for extracting leads from Notion CRM database"""
@@ -20,6 +44,29 @@ class NotionCRMTool(BaseTool):
     notion_token: str = Field(default_factory=lambda: os.getenv("NOTION_INTEGRATION_SECRET", ""))
     database_id: str = Field(default_factory=lambda: os.getenv("NOTION_DATABASE_ID", ""))
 
+    # Optional enrichment with page body and comments for leads that will be alerted
+    enrich_content: bool = Field(
+        default_factory=lambda: os.getenv("NOTION_ENRICH_CONTENT", "").lower() in ("1", "true", "yes")
+    )
+    enrich_min_days: int = Field(default_factory=lambda: int(os.getenv("NOTION_ENRICH_MIN_DAYS", "7")))
+    enrich_max_workers: int = Field(default_factory=lambda: int(os.getenv("NOTION_ENRICH_WORKERS", "3")))
+    # Keep the agent's context small: truncate page bodies and keep only the latest comments
+    enrich_max_chars: int = Field(default_factory=lambda: int(os.getenv("NOTION_ENRICH_MAX_CHARS", "1500")))
+    enrich_max_comments: int = Field(default_factory=lambda: int(os.getenv("NOTION_ENRICH_MAX_COMMENTS", "3")))
+    enrich_max_depth: int = Field(default_factory=lambda: int(os.getenv("NOTION_ENRICH_MAX_DEPTH", "3")))
+    # Notion allows an average of 3 requests per second per integration
+    requests_per_second: float = 3.0
+    cache_path: str = Field(
+        default_factory=lambda: os.getenv("NOTION_CONTENT_CACHE", ".cache/notion_content.json")
+    )
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.notion_token}",
+            "Notion-Version": NOTION_VERSION,
+            "Content-Type": "application/json"
+        }
+
     def _run(self) -> List[Dict[str, Any]]:
         """
         Extract all leads from Notion CRM database
@@ -32,12 +79,8 @@ class NotionCRMTool(BaseTool):
 
         try:
             # Query the database using Notion API
-            url = f"https://api.notion.com/v1/databases/{self.database_id}/query"
-            headers = {
-                "Authorization": f"Bearer {self.notion_token}",
-                "Notion-Version": "2022-06-28",
-                "Content-Type": "application/json"
-            }
+            url = f"{NOTION_API_URL}/databases/{self.database_id}/query"
+            headers = self._headers()
 
             response = requests.post(url, headers=headers, json={})
 
@@ -55,6 +98,7 @@ class NotionCRMTool(BaseTool):
                 lead_data = {
                     "id": page.get("id", ""),
                     "url": page.get("url", ""),
+                    "last_edited_time": page.get("last_edited_time", ""),
                 }
 
                 # Extract Point of Contact (person name)
@@ -154,10 +198,7 @@ class NotionCRMTool(BaseTool):
                 # Extract Notes
                 notes_prop = properties.get("Notes", {})
                 notes_text = notes_prop.get("rich_text", [])
-                if notes_text:
-                    lead_data["notes"] = notes_text[0].get("plain_text", "")
-                else:
-                    lead_data["notes"] = ""
+                lead_data["notes"] = "".join(fragment.get("plain_text", "") for fragment in notes_text)
 
                 # Extract Owner
                 owner_prop = properties.get("Owner", {})
@@ -174,9 +215,190 @@ class NotionCRMTool(BaseTool):
 
                 leads.append(lead_data)
 
+            if self.enrich_content:
+                self.enrich_leads(
+                    [lead for lead in leads if lead["days_since_contact"] >= self.enrich_min_days],
+                    active_ids={lead["id"] for lead in leads}
+                )
+
             return leads
 
         except requests.exceptions.RequestException as e:
             raise Exception(f"Network error querying Notion: {str(e)}")
         except Exception as e:
             raise Exception(f"Error querying Notion database: {str(e)}")
+
+    def enrich_leads(
+        self, leads: List[Dict[str, Any]], active_ids: Optional[Set[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Add page body text and the latest comments to the given leads
+
+        Pages are fetched concurrently by a bounded worker pool that shares a
+        rate limiter. Page bodies are cached locally by page id and
+        last_edited_time, so unchanged pages are never fetched twice. Comments
+        do not change last_edited_time, so they are always fetched fresh.
+
+        Args:
+            leads: Leads returned by _run (modified in place)
+            active_ids: Ids of every page in the database; cached pages not
+                listed here (archived or deleted) are dropped from the cache
+
+        Returns:
+            The same leads with "page_content" and "comments" filled in
+        """
+        cache = self._load_cache()
+        cache_updated = False
+
+        if active_ids is not None:
+            stale_ids = [page_id for page_id in cache if page_id not in active_ids]
+            for page_id in stale_ids:
+                del cache[page_id]
+            cache_updated = bool(stale_ids)
+
+        if not leads:
+            if cache_updated:
+                self._save_cache(cache)
+            return leads
+
+        limiter = _RateLimiter(self.requests_per_second)
+
+        with ThreadPoolExecutor(max_workers=max(1, self.enrich_max_workers)) as executor:
+            futures = {}
+            # Taken before any request, so edits made while fetching are never missed
+            fetched_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+            for lead in leads:
+                if self._is_cached(cache.get(lead["id"]), lead.get("last_edited_time", "")):
+                    cached = cache[lead["id"]]
+                    lead["page_content"] = self._truncate(cached.get("page_content", ""))
+                    fetch_body = False
+                else:
+                    fetch_body = True
+                futures[executor.submit(self._fetch_page_content, lead["id"], fetch_body, limiter)] = lead
+
+            for future in as_completed(futures):
+                lead = futures[future]
+                try:
+                    page_content, comments = future.result()
+                except Exception as e:
+                    print(f"Warning: Could not fetch content for page '{lead['id']}': {e}")
+                    lead.setdefault("page_content", "")
+                    lead["comments"] = []
+                    continue
+
+                if page_content is not None:
+                    lead["page_content"] = self._truncate(page_content)
+                    cache[lead["id"]] = {
+                        "last_edited_time": lead.get("last_edited_time", ""),
+                        "fetched_at": fetched_at,
+                        "page_content": page_content,
+                    }
+                    cache_updated = True
+                lead["comments"] = comments[-self.enrich_max_comments:] if self.enrich_max_comments > 0 else []
+
+        if cache_updated:
+            self._save_cache(cache)
+
+        return leads
+
+    @staticmethod
+    def _is_cached(cached: Any, last_edited_time: str) -> bool:
+        """Check whether a cached page body is still current"""
+        if not isinstance(cached, dict) or not last_edited_time:
+            return False
+        if cached.get("last_edited_time") != last_edited_time:
+            return False
+        # Notion rounds last_edited_time to the minute (UTC), so a body fetched
+        # during that same minute may have missed a later edit
+        return cached.get("fetched_at", "")[:16] > last_edited_time[:16]
+
+    def _truncate(self, text: str) -> str:
+        """Limit page content so long pages do not flood the agent's context"""
+        if self.enrich_max_chars > 0 and len(text) > self.enrich_max_chars:
+            return text[:self.enrich_max_chars].rstrip() + "…"
+        return text
+
+    def _fetch_page_content(
+        self, page_id: str, fetch_body: bool, limiter: _RateLimiter
+    ) -> Tuple[Optional[str], List[str]]:
+        """Fetch the plain text of a page body (if requested) and its comments, oldest first"""
+        page_content = None
+        if fetch_body:
+            lines: List[str] = []
+            self._collect_block_text(page_id, lines, 0, limiter)
+            page_content = "\n".join(lines)
+
+        comments = []
+        results = self._get_paginated(f"{NOTION_API_URL}/comments", {"block_id": page_id}, limiter)
+        for comment in sorted(results, key=lambda c: c.get("created_time", "")):
+            text = "".join(fragment.get("plain_text", "") for fragment in comment.get("rich_text", []))
+            if text:
+                comments.append(text)
+
+        return page_content, comments
+
+    def _collect_block_text(self, block_id: str, lines: List[str], depth: int, limiter: _RateLimiter):
+        """Append the text of a block's children, descending into toggles and nested lists"""
+        for block in self._get_paginated(f"{NOTION_API_URL}/blocks/{block_id}/children", {}, limiter):
+            block_type = block.get("type", "")
+            block_content = block.get(block_type, {})
+            text = "".join(fragment.get("plain_text", "") for fragment in block_content.get("rich_text", []))
+            if text:
+                lines.append("  " * depth + text)
+
+            # Sub-pages and databases are separate records, not part of this lead's notes
+            if (
+                block.get("has_children")
+                and block_type not in ("child_page", "child_database")
+                and depth + 1 < self.enrich_max_depth
+            ):
+                self._collect_block_text(block["id"], lines, depth + 1, limiter)
+
+    def _get_paginated(self, url: str, params: Dict[str, Any], limiter: _RateLimiter) -> List[Dict[str, Any]]:
+        """GET every page of a Notion list endpoint, retrying once on rate limiting"""
+        results = []
+        params = dict(params, page_size=100)
+
+        while True:
+            limiter.wait()
+            response = requests.get(url, headers=self._headers(), params=params, timeout=30)
+
+            if response.status_code == 429:
+                time.sleep(float(response.headers.get("Retry-After", "1")))
+                limiter.wait()
+                response = requests.get(url, headers=self._headers(), params=params, timeout=30)
+
+            if response.status_code != 200:
+                raise Exception(f"Notion API error {response.status_code}: {response.text}")
+
+            data = response.json()
+            results.extend(data.get("results", []))
+
+            if not data.get("has_more"):
+                return results
+            params["start_cursor"] = data.get("next_cursor")
+
+    def _load_cache(self) -> Dict[str, Any]:
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("expected a JSON object")
+            return data
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable Notion content cache '{self.cache_path}': {e}")
+            return {}
+
+    def _save_cache(self, cache: Dict[str, Any]):
+        directory = os.path.dirname(self.cache_path)
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(cache, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Warning: Could not write Notion content cache '{self.cache_path}': {e}")
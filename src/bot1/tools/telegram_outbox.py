@@ -0,0 +1,163 @@
+"""Persistent local outbox for Telegram deliveries"""
+import hashlib
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+class TelegramOutbox:
+    """SQLite-backed queue of rendered Telegram messages
+
+    Each message is stored with an idempotency key derived from its
+    destination, text and scope (e.g. the run date), so enqueuing the same
+    alert twice within a scope never sends it twice. Messages stay in the
+    outbox until they are sent, permanently rejected by Telegram or too old
+    to be worth sending.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idempotency_key TEXT NOT NULL UNIQUE,
+                    chat_id TEXT NOT NULL,
+                    thread_id TEXT NOT NULL DEFAULT '',
+                    text TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT NOT NULL DEFAULT '',
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(chat_id: str, thread_id: str, text: str, scope: str) -> str:
+        """Build the idempotency key for a message, its destination and scope"""
+        return hashlib.sha256(f"{scope}\n{chat_id}\n{thread_id}\n{text}".encode("utf-8")).hexdigest()
+
+    def enqueue(self, chat_id: str, thread_id: str, text: str, scope: str) -> Tuple[str, str]:
+        """
+        Store a message for delivery unless it is already in the outbox
+
+        A message that previously failed is queued again as if it were new.
+
+        Returns:
+            Tuple of (idempotency key, current status of the message)
+        """
+        key = self.make_key(chat_id, thread_id, text, scope)
+        now = _now()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO outbox "
+                "(idempotency_key, chat_id, thread_id, text, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, chat_id, thread_id, text, PENDING, now, now)
+            )
+            conn.execute(
+                "UPDATE outbox SET status = ?, last_error = '', created_at = ?, updated_at = ? "
+                "WHERE idempotency_key = ? AND status = ?",
+                (PENDING, now, now, key, FAILED)
+            )
+            row = conn.execute("SELECT status FROM outbox WHERE idempotency_key = ?", (key,)).fetchone()
+        return key, row["status"]
+
+    def claim(self, key: str) -> bool:
+        """
+        Atomically move a pending message to "sending"
+
+        Returns:
+            True if this caller now owns the delivery, False if it is not pending
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE outbox SET status = ?, updated_at = ? WHERE idempotency_key = ? AND status = ?",
+                (SENDING, _now(), key, PENDING)
+            )
+            return cursor.rowcount == 1
+
+    def reconcile(self, stale_after: timedelta) -> int:
+        """
+        Return messages stuck in "sending" by an interrupted run to the queue
+
+        Only messages not updated for stale_after are requeued, so deliveries
+        in progress in another process are left alone.
+
+        Returns:
+            Number of messages requeued
+        """
+        cutoff = _now(datetime.now(timezone.utc) - stale_after)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE outbox SET status = ?, updated_at = ? WHERE status = ? AND updated_at < ?",
+                (PENDING, _now(), SENDING, cutoff)
+            )
+            return cursor.rowcount
+
+    def expire(self, max_age: timedelta) -> int:
+        """
+        Give up on pending messages queued longer than max_age ago
+
+        Keeps a long outage (e.g. a revoked bot token) from flushing a pile
+        of outdated alerts once delivery works again.
+
+        Returns:
+            Number of messages marked failed
+        """
+        cutoff = _now(datetime.now(timezone.utc) - max_age)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE outbox SET status = ?, last_error = ?, updated_at = ? WHERE status = ? AND created_at < ?",
+                (FAILED, f"Expired: not delivered within {max_age}", _now(), PENDING, cutoff)
+            )
+            return cursor.rowcount
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """List messages waiting for delivery, oldest first"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM outbox WHERE status = ? ORDER BY id", (PENDING,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a message by its idempotency key"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM outbox WHERE idempotency_key = ?", (key,)).fetchone()
+        return dict(row) if row else None
+
+    def mark(self, key: str, status: str, error: str = "", attempts: int = 0):
+        """Record the outcome of a delivery attempt"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE outbox SET status = ?, last_error = ?, attempts = attempts + ?, updated_at = ? "
+                "WHERE idempotency_key = ?",
+                (status, error, attempts, _now(), key)
+            )
+
+
+def _now(moment: Optional[datetime] = None) -> str:
+    # Fixed-width UTC timestamps so they compare correctly as text across DST and hosts
+    return (moment or datetime.now(timezone.utc)).isoformat(timespec="seconds")
@@ -1,10 +1,37 @@
 """Telegram Tool for sending formatted alerts to group"""
 import os
+import time
 import requests
-from typing import Any
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
 from crewai.tools import BaseTool
 from pydantic import Field
 
+from .telegram_outbox import TelegramOutbox, SENDING, SENT, FAILED, PENDING
+
+
+class TelegramDeliveryError(Exception):
+    """Raised when Telegram does not accept a message
+
+    retryable errors are worth retrying right away (timeouts, rate limits);
+    permanent errors mean Telegram will never accept the message as is.
+    Anything else (e.g. a bad token) stays queued until the next run.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        retryable: bool = False,
+        permanent: bool = False,
+        retry_after: float = 0.0,
+        status_code: int = 0
+    ):
+        super().__init__(message)
+        self.retryable = retryable
+        self.permanent = permanent
+        self.retry_after = retry_after
+        self.status_code = status_code
+
 
 class TelegramNotificationTool(BaseTool):
     """Tool for sending formatted notifications to Telegram group"""
@@ -19,9 +46,29 @@ class TelegramNotificationTool(BaseTool):
     group_id: str = Field(default_factory=lambda: os.getenv("TELEGRAM_GROUP_ID", ""))
     thread_id: str = Field(default_factory=lambda: os.getenv("TELEGRAM_THREAD_ID", ""))
 
+    # Rendered messages are persisted here before delivery so they survive failures
+    outbox_path: str = Field(
+        default_factory=lambda: os.getenv("TELEGRAM_OUTBOX_PATH", ".cache/telegram_outbox.db")
+    )
+    # Identical messages are only sent once per scope (defaults to today's date)
+    outbox_scope: str = Field(default_factory=lambda: os.getenv("TELEGRAM_OUTBOX_SCOPE", ""))
+    # Queued messages older than this are dropped instead of sent late (0 keeps them forever)
+    outbox_max_age_hours: float = Field(
+        default_factory=lambda: float(os.getenv("TELEGRAM_OUTBOX_MAX_AGE_HOURS", "20"))
+    )
+    max_retries: int = 3
+    retry_backoff: float = 2.0
+    max_retry_wait: float = 60.0
+    # Messages left in "sending" longer than this are assumed to be from a crashed run
+    sending_timeout: float = 900.0
+
     def _run(self, message: str) -> str:
         """
-        Send a message to the configured Telegram group
+        Queue a message for the configured Telegram group and try to send it once
+
+        Failed deliveries are not retried here, so the crew never waits on
+        Telegram; they are retried by drain() after the crew finishes and on
+        the next run.
 
         Args:
             message: Formatted message text (supports Markdown)
@@ -33,32 +80,163 @@ class TelegramNotificationTool(BaseTool):
             raise ValueError("TELEGRAM_BOT_TOKEN and TELEGRAM_GROUP_ID must be set in environment")
 
         try:
-            # Use Telegram Bot API directly
-            url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
-
-            payload = {
-                "chat_id": self.group_id,
-                "text": message,
-                "parse_mode": "HTML",
-                "disable_web_page_preview": True
-            }
+            outbox = TelegramOutbox(self.outbox_path)
+            scope = self.outbox_scope or date.today().isoformat()
+            key, status = outbox.enqueue(self.group_id, self.thread_id, message, scope)
+        except Exception as e:
+            # A broken local outbox must never cost us the alert itself
+            print(f"Warning: Telegram outbox unavailable, sending without it: {e}")
+            return self._send_direct(message)
 
-            # Add thread_id if sending to a topic/subtopic
-            if self.thread_id:
-                payload["message_thread_id"] = int(self.thread_id)
+        try:
+            if status == SENT:
+                return f"✅ Message already sent to Telegram group {self.group_id}"
+            if status == PENDING:
+                status = self._deliver(outbox, outbox.get(key), max_attempts=1)
 
-            response = requests.post(url, json=payload, timeout=10)
+            item = outbox.get(key)
+        except Exception as e:
+            return f"❌ Error sending Telegram message: {str(e)}"
 
-            if response.status_code == 200:
-                return f"✅ Message sent successfully to Telegram group {self.group_id}"
-            else:
-                error_data = response.json()
-                error_msg = error_data.get("description", "Unknown error")
-                return f"❌ Telegram API error: {error_msg}"
+        if status == SENT:
+            return f"✅ Message sent successfully to Telegram group {self.group_id}"
+        if status == FAILED:
+            return f"❌ Telegram API error: {item['last_error']}"
+        if status == SENDING:
+            return f"📤 Message is being delivered to Telegram group {self.group_id}"
+        return (
+            f"📥 Message queued for delivery to Telegram group {self.group_id} "
+            f"and will be retried: {item['last_error']}"
+        )
 
-        except requests.exceptions.Timeout:
-            return "❌ Error: Request to Telegram API timed out"
-        except requests.exceptions.RequestException as e:
-            return f"❌ Network error sending Telegram message: {str(e)}"
+    def _send_direct(self, message: str) -> str:
+        """Send a message without the outbox, reporting the outcome as text"""
+        try:
+            self._send(self.group_id, self.thread_id, message)
+        except TelegramDeliveryError as e:
+            if e.status_code:
+                return f"❌ Telegram API error: {str(e)}"
+            if isinstance(e.__cause__, requests.exceptions.Timeout):
+                return f"❌ Error: {str(e)}"
+            return f"❌ {str(e)}"
         except Exception as e:
             return f"❌ Error sending Telegram message: {str(e)}"
+        return f"✅ Message sent successfully to Telegram group {self.group_id}"
+
+    def drain(self, outbox: Optional[TelegramOutbox] = None) -> Dict[str, int]:
+        """
+        Deliver every pending message in the outbox, oldest first
+
+        Messages stuck in "sending" by a crashed run are requeued first, and
+        messages older than outbox_max_age_hours are given up on. Temporary failures are retried with backoff and stay pending if they
+        keep failing; messages Telegram rejects outright are marked failed.
+
+        Args:
+            outbox: Outbox to drain (defaults to the one at outbox_path)
+
+        Returns:
+            Count of messages sent, still pending and failed in this drain
+        """
+        if not self.bot_token:
+            raise ValueError("TELEGRAM_BOT_TOKEN must be set in environment")
+
+        outbox = outbox or TelegramOutbox(self.outbox_path)
+        outbox.reconcile(timedelta(seconds=self.sending_timeout))
+        if self.outbox_max_age_hours > 0:
+            expired = outbox.expire(timedelta(hours=self.outbox_max_age_hours))
+            if expired:
+                print(f"Warning: Dropped {expired} Telegram alert(s) older than {self.outbox_max_age_hours:g} hours")
+        counts = {SENT: 0, PENDING: 0, FAILED: 0}
+
+        for item in outbox.pending():
+            try:
+                status = self._deliver(outbox, item, self.max_retries)
+            except Exception as e:
+                print(f"Warning: Could not deliver outbox message {item['id']}: {e}")
+                status = FAILED
+            if status in counts:
+                counts[status] += 1
+
+        return counts
+
+    def _deliver(self, outbox: TelegramOutbox, item: Dict[str, Any], max_attempts: int) -> str:
+        """
+        Claim and send one outbox message, recording the outcome
+
+        Returns:
+            The message status afterwards ("sending" if another run owns it)
+        """
+        key = item["idempotency_key"]
+        if not outbox.claim(key):
+            current = outbox.get(key)
+            return current["status"] if current else ""
+
+        max_attempts = max(1, max_attempts)
+        attempt = 0
+        try:
+            for attempt in range(1, max_attempts + 1):
+                try:
+                    self._send(item["chat_id"], item["thread_id"], item["text"])
+                except TelegramDeliveryError as e:
+                    if e.retryable and attempt < max_attempts:
+                        time.sleep(min(max(e.retry_after, self.retry_backoff ** attempt), self.max_retry_wait))
+                        # Refresh updated_at so other runs don't treat this delivery as stale
+                        outbox.mark(key, SENDING, str(e))
+                        continue
+                    status = FAILED if e.permanent else PENDING
+                    outbox.mark(key, status, str(e), attempts=attempt)
+                    return status
+                outbox.mark(key, SENT, attempts=attempt)
+                return SENT
+        except Exception as e:
+            outbox.mark(key, FAILED, f"Error sending Telegram message: {str(e)}", attempts=max(attempt, 1))
+            return FAILED
+        # Not reached with max_attempts >= 1, but never leave a claimed message stuck in "sending"
+        outbox.mark(key, PENDING, attempts=attempt)
+        return PENDING
+
+    def _send(self, chat_id: str, thread_id: str, text: str):
+        """Send a single message through the Telegram Bot API"""
+        # Use Telegram Bot API directly
+        url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
+
+        payload: Dict[str, Any] = {
+            "chat_id": chat_id,
+            "text": text,
+            "parse_mode": "HTML",
+            "disable_web_page_preview": True
+        }
+
+        # Add thread_id if sending to a topic/subtopic
+        if thread_id:
+            payload["message_thread_id"] = int(thread_id)
+
+        try:
+            response = requests.post(url, json=payload, timeout=10)
+        except requests.exceptions.Timeout as e:
+            raise TelegramDeliveryError("Request to Telegram API timed out", retryable=True) from e
+        except requests.exceptions.RequestException as e:
+            raise TelegramDeliveryError(f"Network error sending Telegram message: {str(e)}", retryable=True) from e
+
+        if response.status_code == 200:
+            return
+
+        try:
+            error_data = response.json()
+        except ValueError:
+            error_data = None
+        if not isinstance(error_data, dict):
+            error_data = {}
+        error_msg = error_data.get("description", "Unknown error")
+        status_code = response.status_code
+
+        if status_code == 429 or status_code >= 500:
+            parameters = error_data.get("parameters")
+            retry_after = parameters.get("retry_after", 0) if isinstance(parameters, dict) else 0
+            raise TelegramDeliveryError(
+                error_msg, retryable=True, retry_after=float(retry_after or 0), status_code=status_code
+            )
+        if status_code in (401, 403):
+            # Bad token or bot removed from the group: keep the message until the setup is fixed
+            raise TelegramDeliveryError(error_msg, status_code=status_code)
+        raise TelegramDeliveryError(error_msg, permanent=True, status_code=status_code)
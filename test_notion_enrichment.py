@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+"""Offline checks for Notion page content enrichment (no network needed)"""
+
+import json
+import os
+import tempfile
+import time
+from unittest import mock
+
+from src.bot1.tools import notion_tool
+from src.bot1.tools.notion_tool import NotionCRMTool, _RateLimiter
+
+
+class FakeResponse:
+    def __init__(self, data, status_code=200):
+        self.status_code = status_code
+        self.data = data
+        self.headers = {}
+        self.text = json.dumps(data)
+
+    def json(self):
+        return self.data
+
+
+def fake_notion_get(calls):
+    """Fake Notion API with one nested toggle per page and two comments"""
+
+    def get(url, headers, params, timeout):
+        calls.append(url)
+        if url.endswith("/comments"):
+            return FakeResponse({"results": [
+                {"created_time": "2026-01-02", "rich_text": [{"plain_text": "second comment"}]},
+                {"created_time": "2026-01-01", "rich_text": [{"plain_text": "first comment"}]},
+            ], "has_more": False})
+        if "/blocks/toggle-" in url:
+            return FakeResponse({"results": [
+                {"id": "nested", "type": "paragraph", "has_children": False,
+                 "paragraph": {"rich_text": [{"plain_text": "follow up friday"}]}},
+            ], "has_more": False})
+        page_id = url.split("/blocks/")[1].split("/")[0]
+        return FakeResponse({"results": [
+            {"id": f"toggle-{page_id}", "type": "toggle", "has_children": True,
+             "toggle": {"rich_text": [{"plain_text": "Call notes"}]}},
+            {"id": f"sub-{page_id}", "type": "child_page", "has_children": True, "child_page": {}},
+        ], "has_more": False})
+
+    return get
+
+
+EDITED = "2026-01-05T10:15:00.000Z"
+EDITED_AGAIN = "2026-01-06T09:00:00.000Z"
+
+
+def make_tool(cache_path, **overrides):
+    settings = dict(
+        notion_token="token",
+        database_id="db",
+        cache_path=cache_path,
+        requests_per_second=0,
+        enrich_max_workers=3,
+        enrich_max_chars=1500,
+        enrich_max_comments=3,
+        enrich_max_depth=3,
+    )
+    settings.update(overrides)
+    return NotionCRMTool(**settings)
+
+
+def test_rate_limiter_spacing():
+    limiter = _RateLimiter(20)
+    start = time.monotonic()
+    for _ in range(4):
+        limiter.wait()
+    # First call goes through immediately, the next three wait 1/20 s each
+    assert time.monotonic() - start >= 0.14
+
+
+def test_enrichment_reads_nested_blocks_and_caches_bodies():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "cache.json")
+        calls = []
+        leads = [{"id": "p1", "last_edited_time": EDITED}, {"id": "p2", "last_edited_time": EDITED}]
+
+        with mock.patch.object(notion_tool.requests, "get", fake_notion_get(calls)):
+            make_tool(cache_path).enrich_leads(leads)
+
+        assert leads[0]["page_content"] == "Call notes\n  follow up friday"
+        assert leads[0]["comments"] == ["first comment", "second comment"]
+        # Page body + toggle children + comments for each lead; sub-pages are skipped
+        assert len(calls) == 6
+
+        calls.clear()
+        leads = [{"id": "p1", "last_edited_time": EDITED}, {"id": "p2", "last_edited_time": EDITED_AGAIN}]
+        with mock.patch.object(notion_tool.requests, "get", fake_notion_get(calls)):
+            make_tool(cache_path).enrich_leads(leads)
+
+        # p1 is unchanged: only its comments are fetched. p2 was edited: body is fetched again.
+        assert sorted(url.split("/v1/")[1] for url in calls) == [
+            "blocks/p2/children", "blocks/toggle-p2/children", "comments", "comments"
+        ]
+        assert leads[0]["page_content"] == "Call notes\n  follow up friday"
+
+
+def test_enrichment_limits_content_size():
+    with tempfile.TemporaryDirectory() as tmp:
+        leads = [{"id": "p1", "last_edited_time": EDITED}]
+        with mock.patch.object(notion_tool.requests, "get", fake_notion_get([])):
+            make_tool(os.path.join(tmp, "cache.json"), enrich_max_chars=4, enrich_max_comments=1).enrich_leads(leads)
+
+        assert leads[0]["page_content"] == "Call…"
+        assert leads[0]["comments"] == ["second comment"]
+
+
+def test_cache_refetches_same_minute_bodies_and_drops_removed_pages():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "cache.json")
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump({
+                # Fetched in the same minute as the last edit: may be missing a later edit
+                "p1": {"last_edited_time": EDITED, "fetched_at": "2026-01-05T10:15:30", "page_content": "old"},
+                "archived": {"last_edited_time": EDITED, "fetched_at": "2026-01-05T11:00:00", "page_content": "x"},
+            }, f)
+
+        calls = []
+        leads = [{"id": "p1", "last_edited_time": EDITED}]
+        with mock.patch.object(notion_tool.requests, "get", fake_notion_get(calls)):
+            make_tool(cache_path).enrich_leads(leads, active_ids={"p1", "p2"})
+
+        assert leads[0]["page_content"] == "Call notes\n  follow up friday"
+        with open(cache_path, encoding="utf-8") as f:
+            assert sorted(json.load(f)) == ["p1"]
+
+
+def test_non_object_cache_is_ignored():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "cache.json")
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump([], f)
+
+        assert make_tool(cache_path)._load_cache() == {}
+
+
+if __name__ == "__main__":
+    for check in (
+        test_rate_limiter_spacing,
+        test_enrichment_reads_nested_blocks_and_caches_bodies,
+        test_enrichment_limits_content_size,
+        test_cache_refetches_same_minute_bodies_and_drops_removed_pages,
+        test_non_object_cache_is_ignored,
+    ):
+        check()
+        print(f"✅ {check.__name__}")
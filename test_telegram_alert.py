@@ -16,6 +16,19 @@ def test_telegram_alert():
     print(f"🤖 Bot Token: {os.getenv('TELEGRAM_BOT_TOKEN')[:20]}...")
     print()
 
+    # Deliver alerts left in the outbox by a previous run before doing any new work
+    from src.bot1.tools.telegram_tool import TelegramNotificationTool
+
+    telegram_tool = TelegramNotificationTool()
+    try:
+        counts = telegram_tool.drain()
+        if counts['sent'] or counts['pending'] or counts['failed']:
+            print(f"📤 Outbox: {counts['sent']} sent, {counts['pending']} pending, {counts['failed']} failed")
+            print()
+    except Exception as e:
+        print(f"⚠️  Could not drain Telegram outbox: {e}")
+        print()
+
     # First, get real data from Notion
     print("📥 Fetching real leads from Notion...")
     from src.bot1.tools.notion_tool import NotionCRMTool
@@ -99,13 +112,15 @@ def test_telegram_alert():
 
     # Send to Telegram
     print("📤 Sending to Telegram...")
-    from src.bot1.tools.telegram_tool import TelegramNotificationTool
-
-    telegram_tool = TelegramNotificationTool()
     result = telegram_tool._run(message)
 
     print(f"\n{result}")
 
+    # Retry with backoff if the first attempt failed; the message stays queued otherwise
+    if result.startswith("📥"):
+        counts = telegram_tool.drain()
+        print(f"📤 Outbox: {counts['sent']} sent, {counts['pending']} pending, {counts['failed']} failed")
+
     return result
 
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+"""Test script for the Telegram outbox, using a temporary database and a mocked Telegram API"""
+
+import os
+import sqlite3
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+import requests
+
+from src.bot1.tools import telegram_tool
+from src.bot1.tools.telegram_outbox import TelegramOutbox, PENDING, SENDING, SENT, FAILED
+from src.bot1.tools.telegram_tool import TelegramNotificationTool
+
+
+def test_outbox_dedup_and_scope():
+    with tempfile.TemporaryDirectory() as tmp:
+        outbox = TelegramOutbox(os.path.join(tmp, "outbox.db"))
+        key, status = outbox.enqueue("-100", "", "All clear", "2026-01-01")
+        assert status == PENDING
+        assert outbox.enqueue("-100", "", "All clear", "2026-01-01") == (key, PENDING)
+        assert len(outbox.pending()) == 1
+
+        outbox.mark(key, SENT)
+        assert outbox.enqueue("-100", "", "All clear", "2026-01-01") == (key, SENT)
+        # Same text on another day is a new message
+        assert outbox.enqueue("-100", "", "All clear", "2026-01-02")[1] == PENDING
+
+
+def test_failed_message_is_requeued_on_enqueue():
+    with tempfile.TemporaryDirectory() as tmp:
+        outbox = TelegramOutbox(os.path.join(tmp, "outbox.db"))
+        key, _ = outbox.enqueue("-100", "", "hello", "2026-01-01")
+        outbox.mark(key, FAILED, "bad html")
+        assert outbox.enqueue("-100", "", "hello", "2026-01-01") == (key, PENDING)
+        assert outbox.get(key)["last_error"] == ""
+
+
+def test_claim_is_exclusive_and_reconcile_only_requeues_stale():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "outbox.db")
+        outbox = TelegramOutbox(path)
+        key, _ = outbox.enqueue("-100", "", "hello", "2026-01-01")
+
+        assert outbox.claim(key)
+        assert not outbox.claim(key)
+        assert outbox.get(key)["updated_at"].endswith("+00:00")
+        assert outbox.reconcile(timedelta(minutes=15)) == 0
+        assert outbox.get(key)["status"] == SENDING
+
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE outbox SET updated_at = '2000-01-01T00:00:00+00:00'")
+        assert outbox.reconcile(timedelta(minutes=15)) == 1
+        assert outbox.get(key)["status"] == PENDING
+
+
+def test_old_messages_expire_instead_of_being_sent():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "outbox.db")
+        outbox = TelegramOutbox(path)
+        old_key, _ = outbox.enqueue("-100", "", "last week's digest", "2026-01-01")
+        new_key, _ = outbox.enqueue("-100", "", "today's digest", "2026-01-08")
+        with sqlite3.connect(path) as conn:
+            conn.execute(
+                "UPDATE outbox SET created_at = '2000-01-01T00:00:00+00:00' WHERE idempotency_key = ?",
+                (old_key,)
+            )
+
+        tool = TelegramNotificationTool(bot_token="token", group_id="-100", outbox_path=path)
+        ok = mock.Mock(status_code=200)
+        with mock.patch.object(telegram_tool.requests, "post", return_value=ok) as post:
+            assert tool.drain() == {SENT: 1, PENDING: 0, FAILED: 0}
+
+        assert post.call_args.kwargs["json"]["text"] == "today's digest"
+        assert outbox.get(old_key)["status"] == FAILED
+        assert outbox.get(new_key)["status"] == SENT
+
+
+def test_run_tries_once_and_drain_retries():
+    with tempfile.TemporaryDirectory() as tmp:
+        tool = TelegramNotificationTool(
+            bot_token="token", group_id="-100", outbox_path=os.path.join(tmp, "outbox.db"), retry_backoff=0.0
+        )
+        with mock.patch.object(telegram_tool.requests, "post", side_effect=[requests.exceptions.Timeout()]) as post:
+            assert tool._run("hello").startswith("📥")
+        assert post.call_count == 1
+
+        responses = [mock.Mock(status_code=500, json=mock.Mock(return_value={})), mock.Mock(status_code=200)]
+        with mock.patch.object(telegram_tool.requests, "post", side_effect=responses):
+            assert tool.drain() == {SENT: 1, PENDING: 0, FAILED: 0}
+            assert tool._run("hello").startswith("✅ Message already sent")
+
+
+def test_status_split_by_error_type():
+    with tempfile.TemporaryDirectory() as tmp:
+        tool = TelegramNotificationTool(bot_token="token", group_id="-100", outbox_path=os.path.join(tmp, "outbox.db"))
+        responses = [
+            mock.Mock(status_code=400, json=mock.Mock(return_value={"description": "can't parse entities"})),
+            mock.Mock(status_code=403, json=mock.Mock(return_value={"description": "bot was kicked"})),
+            mock.Mock(status_code=429, json=mock.Mock(return_value=["not", "a", "dict"])),
+        ]
+        with mock.patch.object(telegram_tool.requests, "post", side_effect=responses):
+            assert tool._run("bad html") == "❌ Telegram API error: can't parse entities"
+            assert tool._run("kicked").startswith("📥")
+            assert tool._run("rate limited").startswith("📥")
+
+        pending = TelegramOutbox(tool.outbox_path).pending()
+        assert [item["text"] for item in pending] == ["kicked", "rate limited"]
+
+
+def test_unexpected_error_marks_message_failed():
+    with tempfile.TemporaryDirectory() as tmp:
+        tool = TelegramNotificationTool(
+            bot_token="token", group_id="-100", thread_id="not-a-number", outbox_path=os.path.join(tmp, "outbox.db")
+        )
+        with mock.patch.object(telegram_tool.requests, "post") as post:
+            assert tool._run("hello").startswith("❌")
+            assert tool.drain() == {SENT: 0, PENDING: 0, FAILED: 0}
+        post.assert_not_called()
+        assert TelegramOutbox(tool.outbox_path).pending() == []
+
+
+def test_zero_attempts_still_sends_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "outbox.db")
+        outbox = TelegramOutbox(path)
+        key, _ = outbox.enqueue("-100", "", "hello", "2026-01-01")
+
+        tool = TelegramNotificationTool(bot_token="token", group_id="-100", outbox_path=path, max_retries=0)
+        with mock.patch.object(telegram_tool.requests, "post", return_value=mock.Mock(status_code=200)):
+            assert tool.drain() == {SENT: 1, PENDING: 0, FAILED: 0}
+        assert outbox.get(key)["status"] == SENT
+
+
+def test_broken_outbox_falls_back_to_direct_send():
+    with tempfile.TemporaryDirectory() as tmp:
+        # A regular file where the outbox directory should be
+        blocker = os.path.join(tmp, "not-a-dir")
+        open(blocker, "w").close()
+
+        tool = TelegramNotificationTool(
+            bot_token="token", group_id="-100", outbox_path=os.path.join(blocker, "outbox.db")
+        )
+        with mock.patch.object(telegram_tool.requests, "post", return_value=mock.Mock(status_code=200)) as post:
+            assert tool._run("hello") == "✅ Message sent successfully to Telegram group -100"
+        assert post.call_count == 1
+
+        with mock.patch.object(telegram_tool.requests, "post", side_effect=requests.exceptions.Timeout()):
+            assert tool._run("hello") == "❌ Error: Request to Telegram API timed out"
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Telegram outbox...")
+    test_outbox_dedup_and_scope()
+    test_failed_message_is_requeued_on_enqueue()
+    test_claim_is_exclusive_and_reconcile_only_requeues_stale()
+    test_old_messages_expire_instead_of_being_sent()
+    test_run_tries_once_and_drain_retries()
+    test_status_split_by_error_type()
+    test_unexpected_error_marks_message_failed()
+    test_zero_attempts_still_sends_once()
+    test_broken_outbox_falls_back_to_direct_send()
+    print("✅ All outbox checks passed")